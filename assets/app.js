@@ -13,11 +13,17 @@
   const tbodyEl = tableEl.querySelector("tbody");
   const generatedAtEl = document.getElementById("generated-at");
 
+  const colStyleEl = document.createElement("style");
+  document.head.appendChild(colStyleEl);
+
   const LTS_STORAGE_KEY = "ltsOnly";
 
   const hiddenCols = new Set();
   let ltsOnly = localStorage.getItem(LTS_STORAGE_KEY) === "true";
   let versions = [];
+  let ltsFlags = [];
+  // Feature data arrives column-wise: features.name[i], features.url[i], ...
+  let features = { name: [], url: [], alias_to: [], availability: [] };
   let rows = [];
 
   // LTS releases are published in March (.3) and August (.8) each year.
@@ -59,10 +65,22 @@
     }
   }
 
-  function featureLabel(feature) {
-    return feature.alias_to
-      ? `${feature.name} (alias for ${feature.alias_to})`
-      : feature.name;
+  const HTML_ESCAPES = {
+    "&": "&amp;",
+    "<": "&lt;",
+    ">": "&gt;",
+    '"': "&quot;",
+    "'": "&#39;",
+  };
+
+  function escapeHtml(value) {
+    return String(value).replace(/[&<>"']/g, (char) => HTML_ESCAPES[char]);
+  }
+
+  function featureLabel(index) {
+    const name = features.name[index];
+    const aliasTo = features.alias_to[index];
+    return aliasTo ? `${name} (alias for ${aliasTo})` : name;
   }
 
   function applyFilter() {
@@ -74,20 +92,23 @@
 
   // Single source of truth for column visibility.
   // A column is shown only when it is NOT manually hidden AND the LTS filter
-  // (if active) allows it.
+  // (if active) allows it. Hidden columns are expressed as rules in one
+  // generated stylesheet, so a toggle rewrites a few selectors instead of
+  // restyling every cell.
   function updateColVisibility() {
-    versions.forEach((version, index) => {
+    const hiddenSelectors = [];
+    versions.forEach((_version, index) => {
       const colIndex = index + 1;
-      // Version columns are the 2nd child onward (1st child is the name col)
-      const cells = tableEl.querySelectorAll(
-        `tr > :nth-child(${colIndex + 1})`,
-      );
       const shouldShow =
-        !hiddenCols.has(colIndex) && (!ltsOnly || isLtsVersion(version));
-      cells.forEach((cell) => {
-        cell.style.display = shouldShow ? "" : "none";
-      });
+        !hiddenCols.has(colIndex) && (!ltsOnly || ltsFlags[index]);
+      if (!shouldShow) {
+        // Version columns are the 2nd child onward (1st child is the name col)
+        hiddenSelectors.push(`#feature_table tr > :nth-child(${colIndex + 1})`);
+      }
     });
+    colStyleEl.textContent = hiddenSelectors.length
+      ? `${hiddenSelectors.join(",\n")} { display: none; }`
+      : "";
     renderRestoreButtons();
   }
 
@@ -101,7 +122,7 @@
       btn.type = "button";
       btn.className = "btn btn-outline-secondary btn-sm me-1 mb-1";
       btn.textContent = `+ ${versions[colIndex - 1]}`;
-      btn.addEventListener("click", () => toggleCol(colIndex));
+      btn.dataset.col = colIndex;
       restoreBtnsEl.appendChild(btn);
     }
   }
@@ -115,77 +136,91 @@
     updateColVisibility();
   }
 
+  // Like the body, the header is assembled as one HTML string; column clicks
+  // are handled by handleColumnToggleClick.
   function buildHeader() {
-    const headerRow = document.createElement("tr");
-
-    const nameHeader = document.createElement("th");
-    nameHeader.className = "name-col";
-    headerRow.appendChild(nameHeader);
+    const parts = ['<tr><th class="name-col"></th>'];
 
     versions.forEach((version, index) => {
-      const th = document.createElement("th");
-      const isLts = isLtsVersion(version);
-      th.className = isLts ? "ver-col ver-col-lts" : "ver-col";
-      th.title = `${version}${isLts && version !== "head" && version !== "latest" ? " (LTS)" : ""} — click to hide`;
-      th.addEventListener("click", () => toggleCol(index + 1));
-
-      const span = document.createElement("span");
-      span.textContent = version;
-      th.appendChild(span);
-
-      headerRow.appendChild(th);
+      const isLts = ltsFlags[index];
+      const label = escapeHtml(version);
+      const ltsSuffix =
+        isLts && version !== "head" && version !== "latest" ? " (LTS)" : "";
+      parts.push(
+        `<th class="${isLts ? "ver-col ver-col-lts" : "ver-col"}" data-col="${index + 1}" title="${label}${ltsSuffix} — click to hide"><span>${label}</span></th>`,
+      );
     });
 
-    theadEl.replaceChildren(headerRow);
+    parts.push("</tr>");
+    theadEl.innerHTML = parts.join("");
   }
 
-  function buildBody(features) {
-    const fragment = document.createDocumentFragment();
-
-    for (const feature of features) {
-      const tr = document.createElement("tr");
-      tr.dataset.name = feature.name.toLowerCase();
-
-      const nameCell = document.createElement("td");
-      nameCell.className = "name-col";
+  // Shared delegated handler for version headers and restore buttons, which
+  // both carry their column index in data-col.
+  function handleColumnToggleClick(event) {
+    const target = event.target.closest("[data-col]");
+    if (target) {
+      toggleCol(Number(target.dataset.col));
+    }
+  }
 
-      if (feature.url) {
-        const link = document.createElement("a");
-        link.href = feature.url;
-        link.textContent = feature.name;
-        nameCell.appendChild(link);
-      } else {
-        nameCell.appendChild(document.createTextNode(feature.name));
-      }
+  // Build the whole body as one HTML string and hand it to the browser's
+  // parser in a single assignment, rather than creating every cell through
+  // the DOM API.
+  function buildBody() {
+    const parts = [];
+
+    features.name.forEach((rawName, index) => {
+      const url = features.url[index];
+      const aliasTo = features.alias_to[index];
+      const name = escapeHtml(rawName);
+      parts.push(
+        `<tr data-name="${escapeHtml(rawName.toLowerCase())}"><td class="name-col">`,
+      );
+      parts.push(url ? `<a href="${escapeHtml(url)}">${name}</a>` : name);
 
-      if (feature.alias_to) {
-        const aliasMark = document.createElement("span");
-        aliasMark.className = "alias-mark";
-        aliasMark.title = `Alias for ${feature.alias_to}`;
-        aliasMark.textContent = "*";
-        nameCell.appendChild(aliasMark);
+      if (aliasTo) {
+        parts.push(
+          `<span class="alias-mark" title="Alias for ${escapeHtml(aliasTo)}">*</span>`,
+        );
       }
 
-      tr.appendChild(nameCell);
+      parts.push("</td>");
 
-      const availability = Array.isArray(feature.availability)
-        ? feature.availability
-        : [];
+      // Availability is packed as 32-bit words (bit i of word i >> 5 for
+      // versions[i]); features available everywhere have null instead.
+      const availability = Array.isArray(features.availability[index])
+        ? features.availability[index]
+        : null;
 
       versions.forEach((version, versionIndex) => {
-        const isAvailable = Boolean(availability[versionIndex]);
-        const td = document.createElement("td");
-        td.className = isAvailable ? "avail" : "unavail";
-        td.title = `${featureLabel(feature)} ${isAvailable ? "available" : "not available"} in ${version}`;
-        td.textContent = isAvailable ? "✓" : "✗";
-        tr.appendChild(td);
+        parts.push(
+          availability === null ||
+            (availability[versionIndex >>> 5] >>> (versionIndex & 31)) & 1
+            ? '<td class="avail">✓</td>'
+            : '<td class="unavail">✗</td>',
+        );
       });
 
-      fragment.appendChild(tr);
-    }
+      parts.push("</tr>");
+    });
+
+    tbodyEl.innerHTML = parts.join("");
+    rows = Array.from(tbodyEl.rows);
+  }
 
-    tbodyEl.replaceChildren(fragment);
-    rows = Array.from(tbodyEl.querySelectorAll("tr"));
+  // Cell tooltips are filled in on first hover by one delegated listener,
+  // instead of building a title string for every cell up front.
+  function handleCellHover(event) {
+    const td = event.target.closest("td.avail, td.unavail");
+    if (!td || td.title) return;
+
+    const index = td.parentElement.sectionRowIndex;
+    const version = versions[td.cellIndex - 1];
+    if (index >= features.name.length || version === undefined) return;
+
+    const isAvailable = td.classList.contains("avail");
+    td.title = `${featureLabel(index)} ${isAvailable ? "available" : "not available"} in ${version}`;
   }
 
   async function loadData() {
@@ -205,11 +240,22 @@
 
       const data = await response.json();
 
+      // Versions arrive ordered and de-duplicated from the build; classify
+      // them once here rather than on every column or LTS toggle.
       versions = Array.isArray(data.versions) ? data.versions : [];
-      const features = Array.isArray(data.features) ? data.features : [];
+      ltsFlags = versions.map(isLtsVersion);
+      const columns = data.features || {};
+      features = {
+        name: Array.isArray(columns.name) ? columns.name : [],
+        url: Array.isArray(columns.url) ? columns.url : [],
+        alias_to: Array.isArray(columns.alias_to) ? columns.alias_to : [],
+        availability: Array.isArray(columns.availability)
+          ? columns.availability
+          : [],
+      };
 
       buildHeader();
-      buildBody(features);
+      buildBody();
       updateColVisibility();
       applyFilter();
 
@@ -234,6 +280,10 @@
     }
   }
 
+  theadEl.addEventListener("click", handleColumnToggleClick);
+  restoreBtnsEl.addEventListener("click", handleColumnToggleClick);
+  tbodyEl.addEventListener("mouseover", handleCellHover);
+
   if (searchInput) {
     searchInput.addEventListener("input", applyFilter);
   }
@@ -0,0 +1,31 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DOCS_FETCH_WORKERS = 16  # concurrent ClickHouse docs page fetches for URL discovery
+HTTP_POOL_SIZE = 2 * DOCS_FETCH_WORKERS  # function + keyword pages fetch at once
+HTTP_USER_AGENT = "clickhouse-function-reference/0.1.0"
+
+
+def create_session() -> requests.Session:
+    # One shared session so repeated calls to the same host reuse pooled
+    # keep-alive connections instead of paying a TCP+TLS handshake each time.
+    session = requests.Session()
+    session.headers.update(
+        {"User-Agent": HTTP_USER_AGENT, "Accept-Encoding": "gzip, deflate"}
+    )
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=HTTP_POOL_SIZE,
+        max_retries=Retry(
+            total=5,
+            backoff_factor=0.5,
+            status_forcelist=[429, 502, 503, 504],
+            allowed_methods=None,
+        ),
+    )
+    session.mount("https://", adapter)
+    return session
+
+
+SESSION = create_session()
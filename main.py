@@ -1,17 +1,18 @@
-import csv
 import json
 import os
 import re
 import subprocess
 import time
+from collections import defaultdict
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from datetime import datetime
+from datetime import datetime, timezone
 from pathlib import Path
 
 import requests
 from jinja2 import Environment, FileSystemLoader, select_autoescape
 from loguru import logger
 
+from http_session import DOCS_FETCH_WORKERS, SESSION
 from scrape_docs import (
     get_anchor_function_doc_pages,
     get_direct_function_doc_urls,
@@ -24,14 +25,18 @@ ALLOWED_TAGS = {"latest", "head"}
 MUTABLE_TAGS = {"latest", "head"}
 USE_FIDDLE = False
 WORKERS = 8  # concurrent Docker containers; ignored when USE_FIDDLE=True
-DOCS_FETCH_WORKERS = 16  # concurrent ClickHouse docs page fetches for URL discovery
+FIDDLE_WORKERS = 4  # concurrent Fiddle API runs; used when USE_FIDDLE=True
 CONTAINER_NAME_TEMPLATE = "clickhouse-function-reference-{tag}"
+SERVER_READY_TIMEOUT = 60  # seconds to wait for a fresh container's server
 CACHE_DIR = "cache"
 IMAGE_DIGESTS_CACHE_PATH = os.path.join(CACHE_DIR, "image_digests.json")
+TAGS_CACHE_PATH = os.path.join(CACHE_DIR, "tags.json")
 FUNCTION_DOCS_CACHE_PATH = os.path.join(CACHE_DIR, "function_docs_urls.json")
 KEYWORD_DOCS_CACHE_PATH = os.path.join(CACHE_DIR, "keyword_docs_urls.json")
 SETTING_DOCS_CACHE_PATH = os.path.join(CACHE_DIR, "setting_docs_urls.json")
 SETTINGS_DOCS_PAGE_URL = "https://clickhouse.com/docs/operations/settings/settings"
+FEATURE_NAME_SEPARATORS_PATTERN = re.compile(r"[\s_\-/]+")
+ANCHOR_ID_PATTERN = re.compile(r'\bid=(?:"([^"]+)"|([^\s>]+))')
 CURATED_DOCS_DIR = "curated_docs_urls"
 CURATED_DOCS_PATHS = {
     "function": os.path.join(CURATED_DOCS_DIR, "functions.json"),
@@ -42,6 +47,7 @@ BASE_DIR = Path(__file__).parent
 TEMPLATES_DIR = BASE_DIR / "templates"
 ASSETS_DIR = BASE_DIR / "assets"
 DATA_DIR = ASSETS_DIR / "data"
+AVAILABILITY_WORD_BITS = 32
 template_env = Environment(
     loader=FileSystemLoader(TEMPLATES_DIR),
     autoescape=select_autoescape(["html", "xml"]),
@@ -51,12 +57,17 @@ template_env = Environment(
 def _process_version(
     version: str, force_refresh: bool = False
 ) -> tuple[str, list, list, list]:
-    return (
+    result = (
         version,
         get_functions(version, force_refresh=force_refresh),
         get_keywords(version, force_refresh=force_refresh),
         get_settings(version, force_refresh=force_refresh),
     )
+    # Tear down in the worker so removals overlap instead of queueing up
+    # behind each other on the main thread.
+    if not USE_FIDDLE:
+        _cleanup_container(version)
+    return result
 
 
 def main() -> None:
@@ -82,7 +93,7 @@ def main() -> None:
         )
     }
 
-    workers = 1 if USE_FIDDLE else WORKERS
+    workers = FIDDLE_WORKERS if USE_FIDDLE else WORKERS
     results: dict[str, tuple] = {}
 
     with ThreadPoolExecutor(max_workers=workers) as executor:
@@ -94,8 +105,6 @@ def main() -> None:
             version, funcs, keywords, settings = future.result()
             results[version] = (funcs, keywords, settings)
             logger.info(f"Finished {version}")
-            if not USE_FIDDLE:
-                _cleanup_container(version)
 
     for tag in refresh_tags:
         digest = resolved_digests.get(tag)
@@ -110,50 +119,48 @@ def main() -> None:
     for v in versions:
         function_info[v], keyword_info[v], setting_info[v] = results[v]
 
-    render(
-        function_info,
-        title="ClickHouse Function Reference",
-        header="ClickHouse Function Availability Reference",
-        feature_type="function",
-        filename="index.html",
-    )
-    render(
-        keyword_info,
-        title="ClickHouse Keyword Reference",
-        header="ClickHouse Keyword Reference",
-        feature_type="keyword",
-        filename="keywords.html",
-    )
-    render(
-        setting_info,
-        title="ClickHouse Setting Reference",
-        header="ClickHouse Setting Reference",
-        feature_type="setting",
-        filename="settings.html",
-    )
+    # Each page resolves its own docs URLs over the network, so build all three
+    # side by side rather than one after another.
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        futures = [
+            executor.submit(
+                render,
+                function_info,
+                title="ClickHouse Function Reference",
+                header="ClickHouse Function Availability Reference",
+                feature_type="function",
+                filename="index.html",
+            ),
+            executor.submit(
+                render,
+                keyword_info,
+                title="ClickHouse Keyword Reference",
+                header="ClickHouse Keyword Reference",
+                feature_type="keyword",
+                filename="keywords.html",
+            ),
+            executor.submit(
+                render,
+                setting_info,
+                title="ClickHouse Setting Reference",
+                header="ClickHouse Setting Reference",
+                feature_type="setting",
+                filename="settings.html",
+            ),
+        ]
+        for future in as_completed(futures):
+            future.result()
 
 
 def _cleanup_container(version: str) -> None:
+    # Containers are throwaway, so force-remove in one call rather than
+    # inspect + graceful stop (up to 10s) + rm.
     proc = subprocess.run(
-        [
-            "docker",
-            "inspect",
-            "-f",
-            "{{.State.Running}}",
-            CONTAINER_NAME_TEMPLATE.format(tag=version),
-        ],
+        ["docker", "rm", "-f", CONTAINER_NAME_TEMPLATE.format(tag=version)],
         capture_output=True,
     )
-    if proc.returncode == 0 and proc.stdout.decode().strip() == "true":
-        logger.info(f"Stopping container for {version}")
-        subprocess.run(
-            ["docker", "stop", CONTAINER_NAME_TEMPLATE.format(tag=version)],
-            capture_output=True,
-        )
-        subprocess.run(
-            ["docker", "rm", CONTAINER_NAME_TEMPLATE.format(tag=version)],
-            capture_output=True,
-        )
+    if proc.returncode == 0:
+        logger.info(f"Removed container for {version}")
 
 
 def load_json_cache(path: str):
@@ -171,18 +178,37 @@ def save_json_cache(path: str, data) -> None:
 
 
 def _normalize_feature_name(value: str) -> str:
-    return re.sub(r"[\s_\-/]+", "", value).lower()
+    return FEATURE_NAME_SEPARATORS_PATTERN.sub("", value).lower()
 
 
 def _fetch_page_ids(page_url: str) -> tuple[str, list[str]]:
     logger.info(f"Fetching docs page: {page_url}")
-    response = requests.get(page_url, timeout=30)
+    response = SESSION.get(page_url, timeout=30)
     response.raise_for_status()
     content = response.text
-    matches = re.findall(r'\bid=(?:"([^"]+)"|([^\s>]+))', content)
+    matches = ANCHOR_ID_PATTERN.findall(content)
     return page_url, [quoted_id or unquoted_id for quoted_id, unquoted_id in matches]
 
 
+def _build_anchor_index(pages: list[str]) -> dict[str, str]:
+    """Fetch every page once and map normalized anchor ids to their URLs."""
+    anchor_urls_by_feature: dict[str, str] = {}
+    with ThreadPoolExecutor(
+        max_workers=min(DOCS_FETCH_WORKERS, len(pages) or 1)
+    ) as executor:
+        futures = {
+            executor.submit(_fetch_page_ids, page_url): page_url for page_url in pages
+        }
+        for future in as_completed(futures):
+            page_url, anchor_ids = future.result()
+            for anchor in anchor_ids:
+                normalized_anchor = _normalize_feature_name(anchor)
+                # Only format a URL for the first page that claims an anchor.
+                if normalized_anchor not in anchor_urls_by_feature:
+                    anchor_urls_by_feature[normalized_anchor] = f"{page_url}#{anchor}"
+    return anchor_urls_by_feature
+
+
 def _load_curated_docs_urls(feature_type: str) -> dict[str, str | None]:
     curated_path = CURATED_DOCS_PATHS[feature_type]
     curated = load_json_cache(curated_path)
@@ -212,18 +238,36 @@ def _apply_curated_overrides(urls: dict[str, str], feature_type: str) -> dict[st
     return merged
 
 
+def _parse_tsv(tsv: str) -> list[dict]:
+    # ClickHouse escapes tabs/newlines inside values instead of quoting them,
+    # so a plain split is both faster and more faithful than the csv module.
+    lines = [line for line in tsv.split("\n") if line]
+    if not lines:
+        return []
+    header = lines[0].split("\t")
+    return [dict(zip(header, line.split("\t"))) for line in lines[1:]]
+
+
 def get_functions(tag: str, force_refresh: bool = False) -> list[dict]:
     cache_path = os.path.join(CACHE_DIR, "functions", f"{tag}.json")
     if not force_refresh:
         cached = load_json_cache(cache_path)
         if cached is not None:
             logger.info(f"Loaded cached functions for {tag}")
-            return cached
+            # Older caches hold every system.functions column; keep only
+            # what render reads so the rest can be freed straight away.
+            return [
+                {key: row[key] for key in ("name", "alias_to") if key in row}
+                for row in cached
+            ]
 
-    tsv = run_query("SELECT * FROM system.functions FORMAT TabSeparatedWithNames", tag)
+    tsv = run_query(
+        "SELECT name, alias_to FROM system.functions FORMAT TabSeparatedWithNames",
+        tag,
+    )
     if tsv is None:
         return []
-    result = list(csv.DictReader(tsv.splitlines(), delimiter="\t"))
+    result = _parse_tsv(tsv)
     save_json_cache(cache_path, result)
     return result
 
@@ -241,7 +285,7 @@ def get_keywords(tag: str, force_refresh: bool = False) -> list[dict]:
     )
     if tsv is None:
         return []
-    result = list(csv.DictReader(tsv.splitlines(), delimiter="\t"))
+    result = _parse_tsv(tsv)
     save_json_cache(cache_path, result)
     return result
 
@@ -259,7 +303,7 @@ def get_settings(tag: str, force_refresh: bool = False) -> list[dict]:
     )
     if tsv is None:
         return []
-    result = list(csv.DictReader(tsv.splitlines(), delimiter="\t"))
+    result = _parse_tsv(tsv)
     save_json_cache(cache_path, result)
     return result
 
@@ -285,18 +329,27 @@ def has_cached_data(tag: str) -> bool:
 
 
 def resolve_image_digests(tags: list[str]) -> dict[str, str]:
+    mutable_tags = [tag for tag in tags if tag in MUTABLE_TAGS]
+    if not mutable_tags:
+        return {}
+
+    # A pull token covers the whole repository, so fetch it once for all tags.
+    token = get_registry_token()
     digests = {}
-    for tag in tags:
-        if tag not in MUTABLE_TAGS:
-            continue
-        digest = get_remote_image_digest(tag)
-        if digest:
-            digests[tag] = digest
+    with ThreadPoolExecutor(max_workers=len(mutable_tags)) as executor:
+        futures = {
+            executor.submit(get_remote_image_digest, tag, token=token): tag
+            for tag in mutable_tags
+        }
+        for future in as_completed(futures):
+            digest = future.result()
+            if digest:
+                digests[futures[future]] = digest
     return digests
 
 
-def get_remote_image_digest(tag: str) -> str | None:
-    token_response = requests.get(
+def get_registry_token() -> str:
+    token_response = SESSION.get(
         "https://auth.docker.io/token",
         params={
             "service": "registry.docker.io",
@@ -305,9 +358,14 @@ def get_remote_image_digest(tag: str) -> str | None:
         timeout=30,
     )
     token_response.raise_for_status()
-    token = token_response.json()["token"]
+    return token_response.json()["token"]
 
-    manifest_response = requests.get(
+
+def get_remote_image_digest(tag: str, token: str | None = None) -> str | None:
+    if token is None:
+        token = get_registry_token()
+
+    manifest_response = SESSION.get(
         f"https://registry-1.docker.io/v2/clickhouse/clickhouse-server/manifests/{tag}",
         headers={
             "Authorization": f"Bearer {token}",
@@ -372,22 +430,9 @@ def get_function_docs_urls(features: list[str]) -> dict[str, str]:
             f"Resolving {len(unresolved_features)} functions via docs page anchors..."
         )
 
-        anchor_urls_by_feature = {}
-        anchor_pages = get_anchor_function_doc_pages(doc_pages)
-        with ThreadPoolExecutor(
-            max_workers=min(DOCS_FETCH_WORKERS, len(anchor_pages) or 1)
-        ) as executor:
-            futures = {
-                executor.submit(_fetch_page_ids, page_url): page_url
-                for page_url in anchor_pages
-            }
-            for future in as_completed(futures):
-                page_url, anchor_ids = future.result()
-                for anchor in anchor_ids:
-                    normalized_anchor = _normalize_feature_name(anchor)
-                    anchor_urls_by_feature.setdefault(
-                        normalized_anchor, f"{page_url}#{anchor}"
-                    )
+        anchor_urls_by_feature = _build_anchor_index(
+            get_anchor_function_doc_pages(doc_pages)
+        )
 
         for feature in unresolved_features:
             normalized_feature = _normalize_feature_name(feature)
@@ -417,11 +462,7 @@ def get_setting_docs_urls(features: list[str]) -> dict[str, str]:
     unresolved_features = [feature for feature in features if feature not in urls]
 
     if unresolved_features:
-        _, anchor_ids = _fetch_page_ids(SETTINGS_DOCS_PAGE_URL)
-        anchor_urls_by_feature = {
-            _normalize_feature_name(anchor): f"{SETTINGS_DOCS_PAGE_URL}#{anchor}"
-            for anchor in anchor_ids
-        }
+        anchor_urls_by_feature = _build_anchor_index([SETTINGS_DOCS_PAGE_URL])
 
         for feature in unresolved_features:
             normalized_feature = _normalize_feature_name(feature)
@@ -453,22 +494,7 @@ def get_keyword_docs_urls(features: list[str]) -> dict[str, str]:
     if unresolved_features:
         statement_pages = get_statement_doc_pages()
         direct_doc_urls = get_direct_statement_doc_urls(statement_pages)
-        anchor_urls_by_feature: dict[str, str] = {}
-
-        with ThreadPoolExecutor(
-            max_workers=min(DOCS_FETCH_WORKERS, len(statement_pages) or 1)
-        ) as executor:
-            futures = {
-                executor.submit(_fetch_page_ids, page_url): page_url
-                for page_url in statement_pages
-            }
-            for future in as_completed(futures):
-                page_url, anchor_ids = future.result()
-                for anchor in anchor_ids:
-                    normalized_anchor = _normalize_feature_name(anchor)
-                    anchor_urls_by_feature.setdefault(
-                        normalized_anchor, f"{page_url}#{anchor}"
-                    )
+        anchor_urls_by_feature = _build_anchor_index(statement_pages)
 
         for feature in unresolved_features:
             normalized_feature = _normalize_feature_name(feature)
@@ -507,7 +533,7 @@ def run_query(query: str, tag: str) -> str | None:
 
 def run_query_against_fiddle(query: str, tag: str) -> str | None:
     logger.info(f"Running query against Fiddle for {tag}")
-    response = requests.post(
+    response = SESSION.post(
         "https://fiddle.clickhouse.com/api/runs",
         json={"query": query, "version": tag},
     )
@@ -549,36 +575,98 @@ def run_query_against_version_locally(query: str, tag: str) -> str | None:
             != 0
         ):
             logger.error(f"Failed to run container for {tag}")
+            return None
 
-    for n in range(60):
-        logger.info(f"Running query for {tag} (attempt {n + 1})")
+        if not _wait_for_server(container_name, tag):
+            return None
+
+    logger.info(f"Running query for {tag}")
+    proc = subprocess.run(
+        [
+            "docker",
+            "exec",
+            "-i",
+            container_name,
+            "clickhouse-client",
+            "--query",
+            query,
+        ],
+        capture_output=True,
+    )
+    stderr = proc.stderr.decode()
+    if proc.returncode == 0 or "UNKNOWN_TABLE" in stderr:
+        return proc.stdout.decode()
+
+    logger.error(f"Failed to run query for {tag}: {stderr}")
+    return None
+
+
+def _wait_for_server(container_name: str, tag: str) -> bool:
+    # Probe with a trivial query (backing off between attempts) so the real
+    # query only runs once the server inside a fresh container accepts them.
+    deadline = time.monotonic() + SERVER_READY_TIMEOUT
+    delay = 0.1
+    while True:
         proc = subprocess.run(
             [
                 "docker",
                 "exec",
-                "-i",
                 container_name,
                 "clickhouse-client",
                 "--query",
-                query,
+                "SELECT 1",
             ],
             capture_output=True,
         )
+        if proc.returncode == 0:
+            return True
         stderr = proc.stderr.decode()
-        if proc.returncode == 0 or "UNKNOWN_TABLE" in stderr:
-            return proc.stdout.decode()
+        if "No such container" in stderr or "is not running" in stderr:
+            logger.error(f"Container for {tag} exited before it was ready: {stderr}")
+            return False
+        if time.monotonic() >= deadline:
+            logger.error(
+                f"Server for {tag} not ready after {SERVER_READY_TIMEOUT}s: {stderr}"
+            )
+            return False
+        time.sleep(delay)
+        delay = min(delay * 2, 1.0)
 
-        if n > 10:
-            logger.warning(f"Query failed, retrying ({n}): {stderr}")
-        time.sleep(0.10)
 
-    logger.error(f"Failed to run query for {tag}")
-    return None
+def _fetch_tags() -> list[str]:
+    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    cached = load_json_cache(TAGS_CACHE_PATH)
+    if not isinstance(cached, dict) or not (
+        isinstance(cached.get("tags"), list) and cached["tags"]
+    ):
+        cached = None
+
+    if cached is not None and cached.get("fetched_on") == today:
+        logger.info("Loaded cached tags")
+        return cached["tags"]
+
+    try:
+        r = SESSION.get("https://fiddle.clickhouse.com/api/tags", timeout=30)
+        r.raise_for_status()
+        tags = r.json().get("result", {}).get("tags")
+        # A 200 with an error body or no tags is as much a failure as a
+        # network error; never let it replace the last good list.
+        if not isinstance(tags, list) or not tags:
+            raise ValueError(f"No tags in Fiddle response: {r.text[:200]}")
+    except (requests.RequestException, ValueError, AttributeError) as e:
+        if cached is None:
+            raise
+        logger.warning(
+            f"Failed to fetch tags, using cache from {cached.get('fetched_on')}: {e}"
+        )
+        return cached["tags"]
+
+    save_json_cache(TAGS_CACHE_PATH, {"fetched_on": today, "tags": tags})
+    return tags
 
 
 def get_tags(exclude_patch: bool = True, exclude_alpine: bool = True) -> list[str]:
-    r = requests.get("https://fiddle.clickhouse.com/api/tags")
-    tags = r.json().get("result", {}).get("tags", [])
+    tags = _fetch_tags()
     if exclude_patch:
         tags = [t for t in tags if t.count(".") == 1 or t in ALLOWED_TAGS]
     if exclude_alpine:
@@ -586,6 +674,16 @@ def get_tags(exclude_patch: bool = True, exclude_alpine: bool = True) -> list[st
     return tags
 
 
+def _pack_availability(bits: int, version_count: int) -> list[int]:
+    # Bit i of word i // 32 is set when the feature exists in versions[i].
+    # 32-bit words stay exact in JS numbers and its bitwise operators.
+    word_mask = (1 << AVAILABILITY_WORD_BITS) - 1
+    return [
+        (bits >> offset) & word_mask
+        for offset in range(0, version_count, AVAILABILITY_WORD_BITS)
+    ]
+
+
 def render(
     version_info: dict,
     title: str = "ClickHouse Function Reference",
@@ -594,47 +692,48 @@ def render(
     filename: str = "index.html",
 ) -> None:
     alias_key = "alias_to" if feature_type == "function" else "alias_for"
-    aliases = {
-        feature["name"]: feature[alias_key]
-        for features in version_info.values()
-        for feature in features
-        if alias_key in feature and feature[alias_key] != ""
-    }
-
-    all_features = sorted(
-        {
-            feature["name"]
-            for features in version_info.values()
-            for feature in features
-            if "name" in feature
-        }
-    )
-
     versions = list(version_info.keys())
 
-    feature_versions = {
-        feature: {
-            tag
-            for tag, features in version_info.items()
-            if any(f.get("name") == feature for f in features)
-        }
-        for feature in all_features
-    }
+    # One pass over every row collects aliases and per-feature availability.
+    aliases: dict[str, str] = {}
+    # Bit i of feature_bits[name] is set when the feature exists in versions[i].
+    feature_bits: dict[str, int] = defaultdict(int)
+    for index, features in enumerate(version_info.values()):
+        version_bit = 1 << index
+        for feature in features:
+            name = feature.get("name")
+            if name is None:
+                continue
+            feature_bits[name] |= version_bit
+            if feature.get(alias_key):
+                aliases[name] = feature[alias_key]
+
+    all_features = sorted(feature_bits)
+    all_versions_bits = (1 << len(versions)) - 1
 
     docs_links = get_feature_docs_urls(feature_type, all_features)
 
-    features = []
+    # Columnar layout: one list per field instead of an object per feature,
+    # so field names are not repeated thousands of times in the payload.
+    features: dict[str, list] = {
+        "name": [],
+        "url": [],
+        "alias_to": [],
+        "availability": [],
+    }
     for feature in all_features:
-        features.append(
-            {
-                "name": feature,
-                "url": docs_links.get(feature)
-                or docs_links.get(aliases.get(feature, "")),
-                "alias_to": aliases.get(feature),
-                "availability": [
-                    version in feature_versions[feature] for version in versions
-                ],
-            }
+        features["name"].append(feature)
+        features["url"].append(
+            docs_links.get(feature) or docs_links.get(aliases.get(feature, ""))
+        )
+        features["alias_to"].append(aliases.get(feature))
+        # Most features exist in every version; shipping null instead of their
+        # availability (the client treats it as "everywhere") keeps the
+        # payload small without dropping them from the reference.
+        features["availability"].append(
+            _pack_availability(feature_bits[feature], len(versions))
+            if feature_bits[feature] != all_versions_bits
+            else None
         )
 
     generated_at = datetime.today().strftime("%Y-%m-%d %H:%M")
@@ -654,20 +753,19 @@ def render(
             separators=(",", ":"),
         )
 
-    # Embed the timestamp in the JSON URL so CDNs treat each regen as a fresh
-    # resource and never serve a stale data file against a freshly-deployed HTML.
+    # Embed the timestamp in the JSON, script and stylesheet URLs so CDNs and
+    # browsers treat each regen as a fresh resource and never pair a stale
+    # app.js with a data file in a newer format (or vice versa).
     cache_buster = generated_at.replace(" ", "T").replace(":", "")
     template = template_env.get_template("reference.html.j2")
-    doc = template.render(
+    template.stream(
         title=title,
         header=header,
         feature_type=feature_type,
         data_url=f"assets/data/{feature_type}s.json?v={cache_buster}",
+        cache_buster=cache_buster,
         generated_at=generated_at,
-    )
-
-    with open(BASE_DIR / filename, "w") as f:
-        f.write(doc)
+    ).dump(str(BASE_DIR / filename), encoding="utf-8")
 
 
 if __name__ == "__main__":
@@ -1,6 +1,8 @@
 import re
+from functools import cache
+from threading import Lock
 
-import requests
+from http_session import SESSION
 
 DOCS_SITEMAP_URL = "https://clickhouse.com/docs/sitemap.xml"
 DOCS_BASE_URL = "https://clickhouse.com/docs"
@@ -8,24 +10,55 @@ FUNCTIONS_PREFIX = "sql-reference/functions/"
 AGGREGATE_FUNCTIONS_PREFIX = "sql-reference/aggregate-functions/"
 AGGREGATE_REFERENCE_PREFIX = "sql-reference/aggregate-functions/reference/"
 STATEMENTS_PREFIX = "sql-reference/statements/"
+FEATURE_NAME_SEPARATORS_PATTERN = re.compile(r"[\s_\-/]+")
+SITEMAP_LOC_PATTERN = re.compile(r"<loc>(https://clickhouse\.com/docs/[^<]+)</loc>")
+FUNCTION_PAGE_PREFIXES = (FUNCTIONS_PREFIX, AGGREGATE_FUNCTIONS_PREFIX)
+EXCLUDED_FUNCTION_PATHS = frozenset(
+    {
+        "sql-reference/functions",
+        "sql-reference/functions/overview",
+        "sql-reference/functions/regular-functions",
+        "sql-reference/aggregate-functions",
+        "sql-reference/aggregate-functions/reference",
+        "sql-reference/aggregate-functions/parametric-functions",
+    }
+)
+EXCLUDED_STATEMENT_PATHS = frozenset(
+    {
+        "sql-reference/statements",
+        "sql-reference/statements/",
+    }
+)
+
+_docs_urls_lock = Lock()
 
 
 def _extract_urls_from_sitemap(xml_text: str) -> list[str]:
-    return re.findall(r"<loc>(https://clickhouse\.com/docs/[^<]+)</loc>", xml_text)
+    return SITEMAP_LOC_PATTERN.findall(xml_text)
 
 
 def _normalize_feature_name(value: str) -> str:
-    return re.sub(r"[\s_\-/]+", "", value).lower()
+    return FEATURE_NAME_SEPARATORS_PATTERN.sub("", value).lower()
 
 
 def _get_path_from_url(url: str) -> str:
     return url.removeprefix(f"{DOCS_BASE_URL}/")
 
 
-def get_docs_urls() -> list[str]:
-    response = requests.get(DOCS_SITEMAP_URL, timeout=30)
+def get_docs_urls() -> tuple[str, ...]:
+    # Function and statement pages are resolved from concurrent renders; the
+    # lock keeps them from both missing the cache and downloading it twice.
+    with _docs_urls_lock:
+        return _fetch_docs_urls()
+
+
+@cache
+def _fetch_docs_urls() -> tuple[str, ...]:
+    # Function and statement page discovery both start from the sitemap, so
+    # download it once per run.
+    response = SESSION.get(DOCS_SITEMAP_URL, timeout=30)
     response.raise_for_status()
-    return _extract_urls_from_sitemap(response.text)
+    return tuple(_extract_urls_from_sitemap(response.text))
 
 
 def _is_candidate_function_page(url: str) -> bool:
@@ -34,22 +67,10 @@ def _is_candidate_function_page(url: str) -> bool:
 
     path = _get_path_from_url(url)
 
-    allowed_prefixes = (
-        FUNCTIONS_PREFIX,
-        AGGREGATE_FUNCTIONS_PREFIX,
-    )
-    if not path.startswith(allowed_prefixes):
+    if not path.startswith(FUNCTION_PAGE_PREFIXES):
         return False
 
-    excluded_paths = {
-        "sql-reference/functions",
-        "sql-reference/functions/overview",
-        "sql-reference/functions/regular-functions",
-        "sql-reference/aggregate-functions",
-        "sql-reference/aggregate-functions/reference",
-        "sql-reference/aggregate-functions/parametric-functions",
-    }
-    if path in excluded_paths:
+    if path in EXCLUDED_FUNCTION_PATHS:
         return False
 
     return True
@@ -61,11 +82,7 @@ def _is_candidate_statement_page(url: str) -> bool:
 
     path = _get_path_from_url(url)
 
-    excluded_paths = {
-        "sql-reference/statements",
-        "sql-reference/statements/",
-    }
-    if path in excluded_paths:
+    if path in EXCLUDED_STATEMENT_PATHS:
         return False
 
     return True